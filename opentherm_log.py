@@ -0,0 +1,219 @@
+import argparse
+import collections
+import logging
+import mmap
+import os
+import numpy as np
+from opentherm import opentherm_ids, flags_msg_generator, \
+    float_msg_generator, int_msg_generator
+
+log = logging.getLogger(__name__)
+
+# Every OTGW frame has the fixed layout matched by `opentherm.line_parser`:
+# one source character followed by eight upper case hex digits
+FRAME_LENGTH = 9
+
+# Number of bytes of the log file that is decoded at once
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# Lookup table to translate ascii bytes to their hex value. Anything that is
+# not a valid (upper case) hex digit maps to 0xFF
+hex_table = np.full(256, 0xFF, dtype=np.uint8)
+hex_table[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+hex_table[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+
+def flags_column_generator(ot_id, data):
+    r"""
+    Generate the columns from an array of boolean values.
+
+    Column-wise equivalent of `opentherm.flags_msg_generator`.
+
+    Returns a dict of column names and arrays
+    """
+    columns = {ot_id: data}
+    if(ot_id == "flame_status"):
+        columns["flame_status_ch"] = data & ( 1 << 1 ) > 0
+        columns["flame_status_dhw"] = data & ( 1 << 2 ) > 0
+        columns["flame_status_bit"] = data & ( 1 << 3 ) > 0
+    return columns
+
+def float_column_generator(ot_id, data):
+    r"""
+    Generate the columns from an array of float-based values
+
+    Column-wise equivalent of `opentherm.float_msg_generator`.
+
+    Returns a dict of column names and arrays
+    """
+    return {ot_id: np.round(data / float(256), 2)}
+
+def int_column_generator(ot_id, data):
+    r"""
+    Generate the columns from an array of integer-based values
+
+    Column-wise equivalent of `opentherm.int_msg_generator`.
+
+    Returns a dict of column names and arrays
+    """
+    return {ot_id: data}
+
+# Map the message generators used in `opentherm.opentherm_ids` to their
+# column-wise counterparts, so the decoding stays in line with the live bridge
+column_generators = {
+    flags_msg_generator: flags_column_generator,
+    float_msg_generator: float_column_generator,
+    int_msg_generator: int_column_generator,
+}
+
+
+def find_frames(buf, first_line=1):
+    r"""
+    Locate the OTGW frames in a buffer of raw log data
+
+    A line is considered a frame when it ends with a valid frame and is either
+    exactly as long as a frame, or the frame is preceded by whitespace (like
+    the timestamped lines written by OTmonitor). Carriage returns are ignored.
+
+    Line numbers start at `first_line` for the first line in the buffer, so
+    consecutive chunks of a log can be numbered continuously.
+
+    Returns a tuple of the (1-based) line numbers and a (n, 9) array holding
+    the bytes of each frame
+    """
+    ends = np.flatnonzero(buf == ord('\n'))
+    if len(buf) and buf[-1] != ord('\n'):
+        # Last line is not terminated
+        ends = np.append(ends, len(buf))
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    # Strip trailing carriage returns
+    cr = ends > starts
+    cr[cr] = buf[ends[cr] - 1] == ord('\r')
+    ends = ends - cr
+    lengths = ends - starts
+
+    lines = np.flatnonzero(lengths >= FRAME_LENGTH)
+    frame_starts = ends[lines] - FRAME_LENGTH
+    prefixed = lengths[lines] > FRAME_LENGTH
+    separator = buf[frame_starts[prefixed] - 1]
+    keep = np.ones(len(lines), dtype=bool)
+    keep[prefixed] = (separator == ord(' ')) | (separator == ord('\t'))
+    lines = lines[keep]
+    frame_starts = frame_starts[keep]
+
+    frames = buf[frame_starts[:, None] + np.arange(FRAME_LENGTH)]
+    return lines + first_line, frames
+
+def decode_frames(lines, frames):
+    r"""
+    Decode an array of OTGW frames in bulk
+
+    Applies the same filtering as `opentherm.get_messages`: only boiler,
+    thermostat and answer frames of type read-ack and write-data for a known
+    opentherm id are decoded.
+
+    Returns a dict of opentherm id names and their columns
+    """
+    nibbles = hex_table[frames[:, 1:]]
+    valid = np.all(nibbles != 0xFF, axis=1) \
+        & np.isin(frames[:, 0], np.frombuffer(b'BTA', dtype=np.uint8)) \
+        & np.isin(nibbles[:, 0] & 7, (1, 4))
+    nibbles = nibbles[valid].astype(np.int64)
+    lines = lines[valid]
+    log.debug("Found %d valid frames", len(lines))
+
+    did = nibbles[:, 2] << 4 | nibbles[:, 3]
+    data = nibbles[:, 4] << 12 | nibbles[:, 5] << 8 \
+        | nibbles[:, 6] << 4 | nibbles[:, 7]
+
+    result = {}
+    for ot_id, (id_name, parser) in opentherm_ids.items():
+        selected = did == ot_id
+        if not selected.any():
+            continue
+        columns = {"line": lines[selected]}
+        columns.update(column_generators[parser](id_name, data[selected]))
+        result[id_name] = columns
+    return result
+
+def decode_file(path, chunk_size=CHUNK_SIZE):
+    r"""
+    Decode all the frames in an OTGW log file
+
+    The file is memory-mapped and decoded in chunks of about `chunk_size`
+    bytes, split on line boundaries, so memory use is bounded by the chunk
+    size and the decoded columns rather than the size of the log.
+
+    Returns a dict of opentherm id names and their columns
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return {}
+    chunks = collections.defaultdict(lambda: collections.defaultdict(list))
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            first_line = 1
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    # Split after the last line break in the chunk, or after
+                    # the next one if a single line exceeds the chunk size
+                    split = mm.rfind(b'\n', start, end)
+                    if split == -1:
+                        split = mm.find(b'\n', end)
+                    end = size if split == -1 else split + 1
+                buf = np.frombuffer(mm, dtype=np.uint8, count=end - start,
+                                    offset=start)
+                try:
+                    decoded = decode_frames(*find_frames(buf, first_line))
+                    first_line += np.count_nonzero(buf == ord('\n'))
+                finally:
+                    # Release the buffer, otherwise the mmap can't be closed
+                    del buf
+                for id_name, columns in decoded.items():
+                    for name, column in columns.items():
+                        chunks[id_name][name].append(column)
+                start = end
+    log.info("Decoded %d opentherm ids from '%s'", len(chunks), path)
+    return {
+        id_name: {name: np.concatenate(parts) for name, parts in columns.items()}
+        for id_name, columns in chunks.items()
+    }
+
+def write_columns(decoded, output, fmt):
+    r"""
+    Write a columnar file per opentherm id to the output directory
+    """
+    os.makedirs(output, exist_ok=True)
+    for id_name, columns in decoded.items():
+        path = os.path.join(output, "{}.{}".format(id_name, fmt))
+        log.info("Writing %d rows to '%s'", len(columns["line"]), path)
+        if fmt == "npz":
+            np.savez_compressed(path, **columns)
+        else:
+            names = list(columns)
+            np.savetxt(path,
+                       np.column_stack([columns[n].astype(float) for n in names]),
+                       fmt=["%d" if columns[n].dtype.kind in 'iub' else "%.2f"
+                            for n in names],
+                       delimiter=",", header=",".join(names), comments="")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode OTGW log files into columnar files per opentherm id")
+    parser.add_argument("logfile", help="OTGW log file to decode")
+    parser.add_argument("-o", "--output", default="otgw_columns", help="Output directory (default: %(default)s)")
+    parser.add_argument("-f", "--format", default="npz", choices=("npz", "csv"), help="Output format (default: %(default)s)")
+    parser.add_argument("-l", "--loglevel", default="INFO", help="Event level to log (default: %(default)s)")
+    args = parser.parse_args()
+
+    num_level = getattr(logging, args.loglevel.upper(), None)
+    if not isinstance(num_level, int):
+        raise ValueError('Invalid log level: %s' % args.loglevel)
+    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=num_level, format=log_format)
+
+    write_columns(decode_file(args.logfile), args.output, args.format)
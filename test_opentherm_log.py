@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+import unittest
+import opentherm
+import opentherm_log
+
+
+class DecodeFileTest(unittest.TestCase):
+    r"""
+    Check the bulk decoder against the line-by-line `opentherm.get_messages`
+    """
+
+    def setUp(self):
+        # Build a fixture log with bare and timestamped frames, carriage
+        # returns, invalid sources, lower case hex, unknown ids and junk lines
+        rnd = random.Random(26)
+        ids = list(opentherm.opentherm_ids) + [5, 200]
+        self.frames = {}
+        lines = []
+        for line in range(1, 5001):
+            frame = "{}{:X}{:X}{:02X}{:04X}".format(
+                rnd.choice("BTARX"), rnd.randrange(16), rnd.randrange(16),
+                rnd.choice(ids), rnd.randrange(1 << 16))
+            kind = rnd.random()
+            if kind < 0.05:
+                frame = frame.lower()
+            if kind < 0.3:
+                lines.append("12:00:00.{:06d}  {}\r\n".format(line, frame))
+            elif kind < 0.35:
+                lines.append("junk\n")
+                continue
+            elif kind < 0.4:
+                lines.append("x{}\n".format(frame))
+                continue
+            else:
+                lines.append("{}\n".format(frame))
+            self.frames[line] = frame
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w', newline='') as f:
+            f.write("".join(lines))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def expected(self):
+        expected = {}
+        for line, frame in sorted(self.frames.items()):
+            info = opentherm.line_parser.match(frame)
+            if info is None \
+                    or int(info.group('id'), 16) not in opentherm.opentherm_ids:
+                continue
+            for topic, value in opentherm.get_messages(frame):
+                name = topic.rsplit('/', 1)[1]
+                expected.setdefault(name, []).append((line, value))
+        return expected
+
+    def decoded(self, **kwargs):
+        decoded = {}
+        for columns in opentherm_log.decode_file(self.path, **kwargs).values():
+            for name, column in columns.items():
+                if name != "line":
+                    decoded[name] = list(zip(columns["line"].tolist(),
+                                             column.tolist()))
+        return decoded
+
+    def test_matches_get_messages(self):
+        self.assertEqual(self.decoded(), self.expected())
+
+    def test_chunked(self):
+        self.assertEqual(self.decoded(chunk_size=1000), self.decoded())
+
+    def test_empty(self):
+        open(self.path, 'w').close()
+        self.assertEqual(opentherm_log.decode_file(self.path), {})
+
+
+if __name__ == "__main__":
+    unittest.main()